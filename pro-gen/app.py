@@ -3,8 +3,10 @@ import pandas as pd
 from typing import List, Dict, Any
 import io
 import os
+import re
 import zipfile
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 from azure.storage.blob import BlobServiceClient
 from openai import AzureOpenAI
@@ -32,6 +34,11 @@ SEARCHSERVICE_ENDPOINT = os.getenv("SEARCHSERVICE_ENDPOINT")
 SEARCHSERVICE_INDEX_NAME = os.getenv("SEARCHSERVICE_INDEX_NAME")
 SEARCHSERVICE_EMBEDDING_DEPLOYMENT_NAME = os.getenv("SEARCHSERVICE_EMBEDDING_DEPLOYMENT_NAME")
 
+# 생성 파일 검증 실패 시 해당 파일만 재생성하는 최대 횟수
+MAX_FILE_RETRIES = 2
+RETRY_WORKERS = 4
+BRACE_CHECK_EXTENSIONS = ('.java', '.gradle', '.kts', '.json')
+
 def init_session_state():
     """세션 상태 초기화"""
     if 'current_page' not in st.session_state:
@@ -277,6 +284,177 @@ def render_page1():
                 st.session_state.current_page = 'page2'
                 st.rerun()
 
+def strip_code_fences(content: str) -> str:
+    """응답 전체를 감싼 ```language``` 코드 펜스만 제거 (본문 안의 펜스는 유지)"""
+    text = (content or '').strip()
+    lines = text.split('\n')
+    opening = re.match(r"^```([\w+#.-]*)[ \t]*$", lines[0])
+    if opening:
+        body = lines[1:]
+        if body and body[-1].strip() == '```':
+            body = body[:-1]
+        has_inner_fence = any(line.lstrip().startswith('```') for line in body)
+        # 내부에 펜스가 있으면 markdown으로 감싼 경우에만 전체 펜스로 간주
+        if not has_inner_fence or opening.group(1).lower() in ('markdown', 'md'):
+            text = '\n'.join(body)
+    return text.strip() + '\n' if text.strip() else ''
+
+def extract_first_code_block(content: str) -> str | None:
+    """응답 중간에 있는 첫 번째 ```language``` 코드 블록 추출 (설명 문구가 섞인 경우 복구용)"""
+    match = re.search(r"^[ \t]*```[\w+#.-]*[ \t]*\n(.*?)(?:\n[ \t]*```[ \t]*$|\Z)", content or '', re.DOTALL | re.MULTILINE)
+    if not match or not match.group(1).strip():
+        return None
+    return match.group(1).strip() + '\n'
+
+def expected_package_from_path(path: str) -> str | None:
+    """파일 경로에서 기대되는 Java 패키지명 추출 (Java 소스 루트가 아니면 None)"""
+    parts = [p for p in (path or '').replace('\\', '/').split('/') if p]
+    if 'resources' in parts:
+        return None
+    for marker in (['src', 'main', 'java'], ['src', 'test', 'java'], ['java'], ['src']):
+        for i in range(len(parts) - len(marker) + 1):
+            if parts[i:i + len(marker)] == marker:
+                package_parts = parts[i + len(marker):]
+                # src/main/kotlin 등 java 이외의 소스 루트는 제외
+                if marker == ['src'] and package_parts[:1] in (['main'], ['test']):
+                    return None
+                return '.'.join(package_parts)
+    return None
+
+def is_java_file(file_info: Dict[str, Any]) -> bool:
+    """Java 소스 파일 여부 (확장자가 없으면 Java 소스 루트 하위인지로 판단)"""
+    name = file_info['name']
+    return name.endswith('.java') or ('.' not in name and expected_package_from_path(file_info['path']) is not None)
+
+def strip_comments_and_strings(content: str) -> str | None:
+    """주석과 문자열/문자 리터럴을 제거한 코드 반환 (블록 주석이나 텍스트 블록이 닫히지 않으면 None)"""
+    code = []
+    i = 0
+    length = len(content)
+    while i < length:
+        if content.startswith('//', i):
+            end = content.find('\n', i)
+            i = length if end == -1 else end
+        elif content.startswith('/*', i):
+            end = content.find('*/', i + 2)
+            if end == -1:
+                return None
+            i = end + 2
+        elif content.startswith('"""', i):
+            end = content.find('"""', i + 3)
+            if end == -1:
+                return None
+            i = end + 3
+        elif content[i] in ('"', "'"):
+            quote = content[i]
+            i += 1
+            while i < length and content[i] != quote and content[i] != '\n':
+                i += 2 if content[i] == '\\' else 1
+            code.append(' ')
+            i += 1
+        else:
+            code.append(content[i])
+            i += 1
+    return ''.join(code)
+
+def has_balanced_braces(content: str) -> bool:
+    """문자열/주석을 제외한 중괄호 짝 검사"""
+    code = strip_comments_and_strings(content)
+    if code is None:
+        return False
+    depth = 0
+    for char in code:
+        if char == '{':
+            depth += 1
+        elif char == '}':
+            depth -= 1
+            if depth < 0:
+                return False
+    return depth == 0
+
+def check_generated_content(file_info: Dict[str, Any], content: str) -> List[str]:
+    """정리된 파일 내용의 검증 오류 목록 반환 (클래스명, 패키지, 중괄호, 빈 내용, 남은 펜스)"""
+    if not content.strip():
+        return ["파일 내용이 비어 있음"]
+
+    errors = []
+    name = file_info['name']
+    java_file = is_java_file(file_info)
+    if re.search(r"^[ \t]*```", content, re.MULTILINE) and (java_file or name.endswith(BRACE_CHECK_EXTENSIONS)):
+        errors.append("코드 펜스(```)가 남아 있음")
+
+    if java_file:
+        code = strip_comments_and_strings(content) or ''
+        class_name = name[:-len('.java')] if name.endswith('.java') else name
+        is_descriptor = class_name in ('package-info', 'module-info')
+        declared = re.findall(
+            r"\bpublic\s+(?:(?:abstract|final|sealed|non-sealed|static|strictfp)\s+)*"
+            r"(?:(?:class|interface|enum|record)|@interface)\s+(\w+)",
+            code
+        )
+        if not declared:
+            declared = re.findall(r"(?:\b(?:class|interface|enum|record)|@interface)\s+(\w+)", code)
+        if not is_descriptor and class_name not in declared:
+            errors.append(f"클래스명이 파일명({class_name})과 일치하지 않음: {declared or '선언 없음'}")
+
+        expected_package = expected_package_from_path(file_info['path'])
+        package_match = re.search(r"^\s*package\s+([\w.]+)\s*;", code, re.MULTILINE)
+        declared_package = package_match.group(1) if package_match else ''
+        if class_name != 'module-info' and expected_package is not None and declared_package != expected_package:
+            errors.append(f"package 선언({declared_package or '없음'})이 경로({expected_package or '기본 패키지'})와 일치하지 않음")
+
+    if (java_file or name.endswith(BRACE_CHECK_EXTENSIONS)) and not has_balanced_braces(content):
+        errors.append("중괄호 짝이 맞지 않음 (응답이 잘렸을 수 있음)")
+
+    return errors
+
+def validate_generated_file(file_info: Dict[str, Any], content: str) -> Dict[str, Any]:
+    """생성된 파일 내용 정리 및 검증 (실패 시 .md 이외 파일은 첫 코드 블록으로 복구 시도)"""
+    cleaned = strip_code_fences(content)
+    errors = check_generated_content(file_info, cleaned)
+
+    if errors and not file_info['name'].lower().endswith('.md'):
+        extracted = extract_first_code_block(content)
+        if extracted is not None:
+            extracted_errors = check_generated_content(file_info, extracted)
+            if len(extracted_errors) < len(errors):
+                cleaned, errors = extracted, extracted_errors
+
+    return {'content': cleaned, 'errors': errors}
+
+def validation_rank(validation: Dict[str, Any]) -> tuple:
+    """검증 결과 비교 기준 (빈 내용이 가장 나쁘고, 그다음 오류 개수)"""
+    return (not validation['content'].strip(), len(validation['errors']))
+
+def write_generated_file(target_folder: str, file_info: Dict[str, Any], content: str) -> str:
+    """생성된 파일을 target 폴더 하위에 저장하고 경로 반환"""
+    # file_info['path']에 이미 프로젝트 구조가 포함되어 있으므로 직접 사용
+    project_folder = os.path.join(target_folder, file_info['path'].strip('/'))
+    os.makedirs(project_folder, exist_ok=True)
+
+    file_path = os.path.join(project_folder, f"{file_info['name']}")
+    with open(file_path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    return file_path
+
+def request_file_content(client: AzureOpenAI, project_summary: str, file_info: Dict[str, Any], file_list: List[Dict[str, Any]], errors: List[str] | None = None) -> str:
+    """AI로 파일 내용 생성 (재시도 시 이전 검증 오류를 함께 전달)"""
+    prompt = f"{project_summary}와 {file_list}를 참고하여 {file_info['name']} 파일 안에 들어갈 코드만 답변하라. ```language```는 제외하라."
+    if errors:
+        prompt += f" 이전 답변은 다음 문제가 있었다: {'; '.join(errors)}. 문제를 수정한 전체 코드를 답변하라."
+
+    response = client.chat.completions.create(
+        model= OPENAI_DEPLOYMENT_NAME,
+        messages=[
+            {
+                "role": "user",
+                "content": prompt
+            }
+        ],
+        temperature=0.7,
+    )
+    return f"""{response.choices[0].message.content}"""
+
 def render_page2():
     """Page 2: 설정 확인 및 프로젝트 생성"""
     st.title("📋 Project Configuration Review")
@@ -496,41 +674,55 @@ def render_page2():
                 generated_files = []
                 target_folder = os.path.join(os.path.dirname(__file__), "target")
                 
-                for file_info in file_list:
-                    # file_info['path']에 이미 프로젝트 구조가 포함되어 있으므로 직접 사용
-                    project_folder = os.path.join(target_folder, file_info['path'].strip('/'))
-                    
-                    # 폴더 생성 (폴더가 없으면 생성)
-                    os.makedirs(project_folder, exist_ok=True)
-                    
-                    # 파일 생성
-                    java_file_path = os.path.join(project_folder, f"{file_info['name']}")
-
-                    # AI로 파일 내용 생성
-                    response = client.chat.completions.create(
-                        model= OPENAI_DEPLOYMENT_NAME,
-                        messages=[
-                            {
-                                "role": "user",
-                                "content": f"{st.session_state.project_summary}와 {file_list}를 참고하여 {file_info['name']} 파일 안에 들어갈 코드만 답변하라. ```language```는 제외하라."
+                project_summary = st.session_state.project_summary
+
+                # AI로 파일 내용 생성 후 바로 검증하여 저장
+                validations = []
+                file_paths = []
+                progress = st.progress(0.0)
+                for index, file_info in enumerate(file_list):
+                    progress.progress(index / len(file_list), text=f"📄 {file_info['name']} 생성 중... ({index + 1}/{len(file_list)})")
+                    content = request_file_content(client, project_summary, file_info, file_list)
+                    validations.append(validate_generated_file(file_info, content))
+                    file_paths.append(write_generated_file(target_folder, file_info, validations[index]['content']))
+                progress.empty()
+
+                # 검증 실패한 파일만 병렬로 재생성 (더 나은 결과만 반영)
+                for attempt in range(1, MAX_FILE_RETRIES + 1):
+                    failed_indexes = [i for i, validation in enumerate(validations) if validation['errors']]
+                    if not failed_indexes:
+                        break
+                    with st.spinner(f"🔁 검증 실패 파일 {len(failed_indexes)}개 재생성 중... ({attempt}/{MAX_FILE_RETRIES})"):
+                        with ThreadPoolExecutor(max_workers=RETRY_WORKERS) as executor:
+                            futures = {
+                                i: executor.submit(
+                                    request_file_content, client, project_summary, file_list[i], file_list, validations[i]['errors']
+                                )
+                                for i in failed_indexes
                             }
-                        ],
-                        temperature=0.7,
-                    )
-                    java_content = f"""{response.choices[0].message.content}"""
-                    
-                    # 파일 쓰기
-                    with open(java_file_path, 'w', encoding='utf-8') as f:
-                        f.write(java_content)
-                    
+                    for i, future in futures.items():
+                        try:
+                            retried = validate_generated_file(file_list[i], future.result())
+                        except Exception as e:
+                            st.warning(f"⚠️ {file_list[i]['name']} 재생성 요청 실패: {str(e)}")
+                            continue
+                        if validation_rank(retried) < validation_rank(validations[i]):
+                            validations[i] = retried
+                            write_generated_file(target_folder, file_list[i], retried['content'])
+
+                for file_info, validation, java_file_path in zip(file_list, validations, file_paths):
                     generated_files.append({
                         'path': java_file_path,
                         'name': file_info['name'],
-                        'content': java_content
+                        'content': validation['content'],
+                        'errors': validation['errors']
                     })
                     
-                    st.success(f"🎉 파일이 성공적으로 생성되었습니다!")
-                    st.info(f"📁 생성된 경로: {project_folder}")
+                    if validation['errors']:
+                        st.warning(f"⚠️ {file_info['name']} 검증 실패: {'; '.join(validation['errors'])}")
+                    else:
+                        st.success(f"🎉 파일이 성공적으로 생성되었습니다!")
+                    st.info(f"📁 생성된 경로: {os.path.dirname(java_file_path)}")
                     st.info(f"📄 생성된 파일: {file_info['name']}")
                 
                 # ZIP 파일 생성